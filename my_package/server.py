@@ -3,7 +3,8 @@
 Web SSH Terminal Server (Windows Compatible)
 =============================================
 A FastAPI server that bridges SSH sessions to the browser via WebSocket.
-Uses Paramiko for SSH, so it works on Windows, macOS, and Linux.
+Uses asyncssh for SSH, so it works on Windows, macOS, and Linux and all
+SSH I/O runs directly on the asyncio event loop.
 
 Usage:
     python server.py --host 0.0.0.0 --port 8765
@@ -13,116 +14,278 @@ Then open http://localhost:8765 in your browser.
 
 import asyncio
 import argparse
+import hashlib
+import os
+import struct
+import time
+from collections import OrderedDict
+from pathlib import Path
 from typing import Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-import paramiko
+import asyncssh
+import orjson
 import uvicorn
 
 
 app = FastAPI(title="Web SSH Terminal")
 
+# The UI is a single static page, so read it once at import time
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+INDEX_HTML = (STATIC_DIR / "index.html").read_bytes()
+
+# Largest chunk pulled from the SSH shell per read
+READ_SIZE = 64 * 1024
+
+# Terminal output is coalesced for a few milliseconds (or until this many bytes
+# are buffered) so bursts like `cat bigfile` go out as a handful of large
+# WebSocket frames instead of thousands of tiny ones.
+OUTPUT_FLUSH_DELAY = 0.003
+OUTPUT_FLUSH_SIZE = 32 * 1024
+# Chunks waiting between the SSH reader and the WebSocket sender, per session
+OUTPUT_QUEUE_SIZE = 64
+
+# Opcodes for binary client frames (first byte of the frame)
+OP_INPUT = 0x00   # followed by raw keystroke bytes
+OP_RESIZE = 0x01  # followed by cols, rows as big-endian uint16
+RESIZE_STRUCT = struct.Struct("!HH")
+
+# Idle SSH connections are kept open this long so reconnects skip the handshake
+POOL_IDLE_TIMEOUT = 600
+POOL_MAX_SIZE = 32
+
+
+class PooledSSHConnection:
+    """An SSH connection shared by every terminal opened with the same credentials."""
+    
+    def __init__(self, conn: asyncssh.SSHClientConnection):
+        self.conn = conn
+        self.channels = 0
+        self.last_used = time.monotonic()
+        self.pooled = True
+    
+    def is_active(self) -> bool:
+        return not self.conn.is_closed()
+
+
+class SSHConnectionPool:
+    """
+    Keeps authenticated SSH connections alive between terminal sessions.
+    
+    SSH multiplexes channels over one connection, so a new terminal for the
+    same user@host:port only needs a new session channel instead of a full
+    TCP + key exchange + auth round trip.
+    """
+    
+    def __init__(self, max_size: int = POOL_MAX_SIZE, idle_timeout: float = POOL_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries: OrderedDict[tuple, PooledSSHConnection] = OrderedDict()
+        # Per-key connect locks, kept only while someone is using or waiting on them
+        self._locks: dict[tuple, asyncio.Lock] = {}
+        self._lock_users: dict[tuple, int] = {}
+        self._reaper: Optional[asyncio.Task] = None
+    
+    async def open_shell(self, host: str, port: int, username: str,
+                         password: str) -> tuple[PooledSSHConnection, asyncssh.SSHClientProcess]:
+        """
+        Open an interactive shell, reusing a pooled connection if possible.
+        
+        Raises whatever asyncssh raises if a new connection has to be made.
+        """
+        # The password is part of the key so a pooled connection is never
+        # handed to someone who didn't authenticate with the same credentials
+        key = (username, host, port, hashlib.sha256(password.encode()).digest())
+        
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._open_shell_locked(key, host, port, username, password)
+        finally:
+            # Drop the lock with its last user so failed logins (e.g. an
+            # endless stream of wrong passwords) don't accumulate locks
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+    
+    async def _open_shell_locked(self, key: tuple, host: str, port: int, username: str,
+                                 password: str) -> tuple[PooledSSHConnection, asyncssh.SSHClientProcess]:
+        """Body of open_shell(), run while holding the key's lock."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.is_active():
+            try:
+                process = await _open_shell(entry.conn)
+                entry.channels += 1
+                self._entries.move_to_end(key)
+                return entry, process
+            except asyncssh.ChannelOpenError:
+                # Usually the server's MaxSessions; fall through to a fresh connection
+                pass
+        if entry is not None:
+            self._discard(key)
+        
+        conn = await _connect(host, port, username, password)
+        try:
+            process = await _open_shell(conn)
+        except BaseException:
+            conn.close()
+            raise
+        
+        entry = PooledSSHConnection(conn)
+        entry.channels = 1
+        self._entries[key] = entry
+        self._evict()
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_idle())
+        return entry, process
+    
+    def release(self, entry: PooledSSHConnection) -> None:
+        """Return a connection to the pool once its shell is closed."""
+        entry.channels -= 1
+        entry.last_used = time.monotonic()
+        if entry.channels == 0 and not entry.pooled:
+            entry.conn.close()
+    
+    def _discard(self, key: tuple) -> None:
+        """Drop a connection from the pool, closing it once nothing uses it."""
+        entry = self._entries.pop(key)
+        entry.pooled = False
+        if entry.channels == 0:
+            entry.conn.close()
+    
+    def _evict(self) -> None:
+        """Close least recently used idle connections while over max_size."""
+        for key in [k for k, e in self._entries.items() if e.channels == 0]:
+            if len(self._entries) <= self.max_size:
+                break
+            self._discard(key)
+    
+    async def _reap_idle(self) -> None:
+        """Close connections that have been idle longer than idle_timeout."""
+        while self._entries:
+            await asyncio.sleep(60)
+            now = time.monotonic()
+            for key, entry in list(self._entries.items()):
+                idle = entry.channels == 0 and now - entry.last_used > self.idle_timeout
+                if idle or not entry.is_active():
+                    self._discard(key)
+        self._reaper = None
+
+
+async def _connect(host: str, port: int, username: str, password: str) -> asyncssh.SSHClientConnection:
+    """Open and authenticate a new SSH connection."""
+    return await asyncssh.connect(
+        host,
+        port=port,
+        username=username,
+        password=password,
+        connect_timeout=10,
+        # Don't apply the server operator's ~/.ssh/config (Host aliases,
+        # ProxyJump, ProxyCommand) to hosts typed into the browser
+        config=None,
+        # Accept unknown host keys (like ssh -o StrictHostKeyChecking=no)
+        known_hosts=None,
+        # Password auth only: no ssh-agent, no ~/.ssh keys, no Kerberos/GSSAPI
+        agent_path=None,
+        client_keys=None,
+        gss_host=None
+    )
+
+
+async def _open_shell(conn: asyncssh.SSHClientConnection) -> asyncssh.SSHClientProcess:
+    """Start an interactive shell on an existing connection."""
+    return await conn.create_process(
+        term_type='xterm-256color',
+        term_size=(80, 24),
+        encoding=None  # Raw bytes in both directions
+    )
+
+
+ssh_pool = SSHConnectionPool()
+
 
 class SSHSession:
     """
-    Manages an SSH connection using Paramiko.
+    Manages one interactive SSH shell using asyncssh.
     Works on Windows, macOS, and Linux.
     """
     
     def __init__(self):
-        self.client: Optional[paramiko.SSHClient] = None
-        self.channel: Optional[paramiko.Channel] = None
+        self.connection: Optional[PooledSSHConnection] = None
+        self.process: Optional[asyncssh.SSHClientProcess] = None
         self.connected = False
         
-    def connect(self, host: str, port: int, username: str, password: str) -> tuple[bool, str]:
+    async def connect(self, host: str, port: int, username: str, password: str) -> tuple[bool, str]:
         """
-        Connect to SSH server.
+        Connect to SSH server, reusing a pooled connection when possible.
         
         Returns:
             (success, message) tuple
         """
         try:
-            self.client = paramiko.SSHClient()
-            # Auto-add unknown host keys (like ssh -o StrictHostKeyChecking=no)
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            self.client.connect(
-                hostname=host,
-                port=port,
-                username=username,
-                password=password,
-                timeout=10,
-                allow_agent=False,
-                look_for_keys=False
-            )
-            
-            # Get an interactive shell channel
-            self.channel = self.client.invoke_shell(
-                term='xterm-256color',
-                width=80,
-                height=24
-            )
-            self.channel.setblocking(0)  # Non-blocking reads
+            self.connection, self.process = await ssh_pool.open_shell(host, port, username, password)
             self.connected = True
             
             return True, "Connected"
             
-        except paramiko.AuthenticationException:
+        except asyncssh.PermissionDenied:
             return False, "Authentication failed - check username/password"
-        except paramiko.SSHException as e:
-            return False, f"SSH error: {e}"
+        except asyncssh.Error as e:
+            return False, f"SSH error: {e.reason}"
+        except asyncio.TimeoutError:
+            return False, "Connection timed out"
         except Exception as e:
             return False, f"Connection failed: {e}"
     
     def resize(self, width: int, height: int) -> None:
         """Resize the terminal."""
-        if self.channel:
+        if self.process:
             try:
-                self.channel.resize_pty(width=width, height=height)
-            except:
-                pass
+                self.process.change_terminal_size(width, height)
+            except (asyncssh.Error, OSError):
+                pass  # Shell already gone
     
-    def read(self) -> bytes:
-        """Read available output from SSH channel (non-blocking)."""
-        if not self.channel:
+    async def read(self) -> bytes:
+        """Wait for output from the SSH shell; returns b"" once it has exited."""
+        if not self.process:
             return b""
         try:
-            if self.channel.recv_ready():
-                return self.channel.recv(4096)
-            return b""
-        except:
-            return b""
+            data = await self.process.stdout.read(READ_SIZE)
+        except (asyncssh.Error, OSError):
+            data = b""
+        if not data:
+            self.connected = False
+        return data
     
     def write(self, data: bytes) -> None:
-        """Write input to SSH channel."""
-        if self.channel:
+        """Write input to the SSH shell."""
+        if self.process:
             try:
-                self.channel.send(data)
-            except:
-                pass
+                self.process.stdin.write(data)
+            except (asyncssh.Error, OSError):
+                pass  # Shell already gone
     
     def close(self) -> None:
-        """Close the SSH connection."""
+        """Close the shell; the connection itself stays pooled."""
         self.connected = False
-        if self.channel:
+        if self.process:
             try:
-                self.channel.close()
-            except:
-                pass
-        if self.client:
-            try:
-                self.client.close()
-            except:
-                pass
-        self.channel = None
-        self.client = None
+                self.process.close()
+            except (asyncssh.Error, OSError):
+                pass  # Shell already gone
+        if self.connection:
+            ssh_pool.release(self.connection)
+        self.process = None
+        self.connection = None
 
 
 @app.get("/", response_class=HTMLResponse)
 async def get_terminal_page():
     """Serve the terminal UI."""
-    return HTMLResponse(content=open("static/index.html").read())
+    return HTMLResponse(content=INDEX_HTML)
 
 
 @app.websocket("/ws/terminal")
@@ -132,36 +295,81 @@ async def terminal_websocket(websocket: WebSocket):
     
     Protocol:
         - Client sends JSON: {"type": "connect", "host": "...", "port": 22, "username": "...", "password": "..."}
-        - Client sends JSON: {"type": "input", "data": "..."} for keystrokes
-        - Client sends JSON: {"type": "resize", "cols": N, "rows": M} for resize
-        - Server sends JSON: {"type": "output", "data": "..."} for terminal output
+        - Client sends binary: OP_INPUT + raw bytes for keystrokes
+        - Client sends binary: OP_RESIZE + cols, rows (big-endian uint16) for resize
+        - Client may also send JSON {"type": "input", ...} / {"type": "resize", ...}
+        - Server sends binary frames containing raw terminal output
         - Server sends JSON: {"type": "error", "message": "..."} for errors
         - Server sends JSON: {"type": "connected"} on successful connection
     """
     await websocket.accept()
     
     ssh_session = SSHSession()
+    loop = asyncio.get_running_loop()
+    output_queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=OUTPUT_QUEUE_SIZE)
     
     async def read_ssh_output():
-        """Continuously read from SSH and send to browser."""
+        """Read from the SSH shell and queue the output for the sender."""
         while ssh_session.connected:
-            await asyncio.sleep(0.02)  # Small delay to batch output
-            data = ssh_session.read()
+            data = await ssh_session.read()
             if data:
+                # Blocks only when the sender is far behind, which lets
+                # SSH flow control push back on the remote side
+                await output_queue.put(data)
+    
+    async def send_ssh_output():
+        """Merge queued output into batches and send them to the browser."""
+        while True:
+            chunk = await output_queue.get()
+            chunks = [chunk]
+            size = len(chunk)
+            deadline = loop.time() + OUTPUT_FLUSH_DELAY
+            while size < OUTPUT_FLUSH_SIZE:
                 try:
-                    # Send as text (base64 or decoded)
-                    await websocket.send_json({
-                        "type": "output",
-                        "data": data.decode('utf-8', errors='replace')
-                    })
-                except:
-                    break
+                    chunk = output_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    # Give the rest of the burst a moment to arrive before flushing
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        chunk = await asyncio.wait_for(output_queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                chunks.append(chunk)
+                size += len(chunk)
+            try:
+                # Raw bytes; xterm.js decodes UTF-8 itself, even across frames.
+                # A lone chunk goes out as-is; several are joined with one copy.
+                await websocket.send_bytes(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+            except (WebSocketDisconnect, RuntimeError, OSError):
+                # Browser is gone; stop pulling from SSH too
+                ssh_session.connected = False
+                break
     
-    output_task = None
+    reader_task = None
+    sender_task = None
     
     try:
         while True:
-            message = await websocket.receive_json()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            
+            payload = frame.get("bytes")
+            if payload is not None:
+                # Binary fast path for keystrokes and resizes; empty or
+                # truncated frames are ignored rather than ending the session
+                if not payload:
+                    continue
+                op = payload[0]
+                if op == OP_INPUT:
+                    ssh_session.write(payload[1:])
+                elif op == OP_RESIZE and len(payload) >= 1 + RESIZE_STRUCT.size:
+                    ssh_session.resize(*RESIZE_STRUCT.unpack_from(payload, 1))
+                continue
+            
+            message = orjson.loads(frame["text"])
             msg_type = message.get("type")
             
             if msg_type == "connect":
@@ -171,12 +379,24 @@ async def terminal_websocket(websocket: WebSocket):
                 username = message.get("username", "pi")
                 password = message.get("password", "")
                 
-                success, msg = ssh_session.connect(host, port, username, password)
+                # Reconnecting on the same socket: shut down the previous shell
+                # first so its tasks don't leak and its pooled connection is released
+                old_tasks = [t for t in (reader_task, sender_task) if t]
+                for task in old_tasks:
+                    task.cancel()
+                await asyncio.gather(*old_tasks, return_exceptions=True)
+                reader_task = sender_task = None
+                ssh_session.close()
+                while not output_queue.empty():
+                    output_queue.get_nowait()
+                
+                success, msg = await ssh_session.connect(host, port, username, password)
                 
                 if success:
                     await websocket.send_json({"type": "connected"})
-                    # Start reading output
-                    output_task = asyncio.create_task(read_ssh_output())
+                    # Start reading output and forwarding it to the browser
+                    reader_task = asyncio.create_task(read_ssh_output())
+                    sender_task = asyncio.create_task(send_ssh_output())
                 else:
                     await websocket.send_json({"type": "error", "message": msg})
                 
@@ -196,8 +416,10 @@ async def terminal_websocket(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        if output_task:
-            output_task.cancel()
+        if reader_task:
+            reader_task.cancel()
+        if sender_task:
+            sender_task.cancel()
         ssh_session.close()
 
 
@@ -205,6 +427,8 @@ def main():
     parser = argparse.ArgumentParser(description="Web SSH Terminal Server")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, each with its own event loop (default: CPU count)")
     args = parser.parse_args()
     
     print(f"""
@@ -218,7 +442,15 @@ def main():
 ╚══════════════════════════════════════════════════════════════╝
     """)
     
-    uvicorn.run(app, host=args.host, port=args.port)
+    # Workers share the listening socket and each runs its own event loop, so
+    # uvicorn needs an import string it can load in every worker process
+    uvicorn.run(
+        "server:app",
+        app_dir=str(Path(__file__).resolve().parent),
+        host=args.host,
+        port=args.port,
+        workers=args.workers
+    )
 
 
 if __name__ == "__main__":